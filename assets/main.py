@@ -34,7 +34,7 @@ def add_asset(
     current_user: models.User = Depends(get_current_user)
 ):
     """Attach an asset to an idea"""
-    idea = session.query(models.Idea).get(idea_id)
+    idea = session.get(models.Idea, idea_id)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     if idea.user_id != current_user.id:
@@ -57,7 +57,11 @@ def add_asset(
 @router.get("/ideas/{idea_id}/assets", response_model=List[AssetResponse])
 def list_assets(idea_id: str, session: Session = Depends(db.get_session)):
     """List all public assets for an idea"""
-    idea = session.query(models.Idea).get(idea_id)
+    idea = session.get(models.Idea, idea_id)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
-    return [a for a in idea.assets if a.visibility == "public"]
\ No newline at end of file
+    return (
+        session.query(models.Asset)
+        .filter(models.Asset.idea_id == idea.id, models.Asset.visibility == "public")
+        .all()
+    )
\ No newline at end of file
@@ -3,32 +3,44 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from datetime import timedelta
+from cachetools import TTLCache
+import hashlib, hmac, os, threading, time
+import jwt
 
 from backend import models, db
 
 router = APIRouter()
 
 # ===== Password Hashing =====
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=10, deprecated="auto")
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+def verify_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    """-> (ok, new_hash); new_hash is set when the stored hash uses outdated settings (e.g. 12 rounds)"""
+    return pwd_context.verify_and_update(password, hashed)
 
 # ===== JWT Setup =====
-SECRET_KEY = "supersecretkey"  # ⚠️ load from .env in prod
+SECRET_KEY = os.getenv("JWT_SECRET", "supersecretkey")  # ⚠️ set JWT_SECRET in prod
+SECRET_KEY_BYTES = SECRET_KEY.encode()  # encoded once, reused for every sign/verify
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    ttl = expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": int(time.time() + ttl.total_seconds())})
+    return jwt.encode(to_encode, SECRET_KEY_BYTES, algorithm=ALGORITHM)
+
+# Recently verified logins, keyed by hmac(SECRET_KEY, email + sha256(password)) -> user_id
+_pw_cache = TTLCache(maxsize=512, ttl=30)
+_pw_lock = threading.Lock()
+
+def _credential_key(email: str, password: str) -> bytes:
+    msg = email.encode() + hashlib.sha256(password.encode()).digest()
+    return hmac.new(SECRET_KEY_BYTES, msg, hashlib.sha256).digest()[:16]
 
 # ===== Schemas =====
 class SignupRequest(BaseModel):
@@ -67,27 +79,55 @@ def signup(req: SignupRequest, session: Session = Depends(db.get_session)):
 # ===== Login =====
 @router.post("/login", response_model=TokenResponse)
 def login(req: LoginRequest, session: Session = Depends(db.get_session)):
-    user = session.query(models.User).filter(models.User.email == req.email).first()
-    if not user or not verify_password(req.password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-
-    token = create_access_token({"sub": str(user.id)})
+    key = _credential_key(req.email, req.password)
+    with _pw_lock:
+        user_id = _pw_cache.get(key)
+
+    if not user_id:
+        user = session.query(models.User).filter(models.User.email == req.email).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        ok, new_hash = verify_password(req.password, user.password_hash)
+        if not ok:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if new_hash:
+            # Re-hash at the current cost so later logins get the cheaper verify
+            user.password_hash = new_hash
+            session.commit()
+        user_id = user.id
+        with _pw_lock:
+            _pw_cache[key] = user_id
+
+    token = create_access_token({"sub": str(user_id)})
     return TokenResponse(access_token=token)
 
 # ===== Current User Dependency =====
 from fastapi.security import OAuth2PasswordBearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Decoded tokens, keyed by sha256(token) -> (user_id, exp), so repeat requests skip jwt.decode
+_tok_cache = TTLCache(maxsize=10_000, ttl=10)
+_tok_lock = threading.Lock()
+
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(db.get_session)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if not user_id:
+    key = hashlib.sha256(token.encode()).digest()
+    with _tok_lock:
+        cached = _tok_cache.get(key)
+
+    if cached and cached[1] > time.time():
+        user_id = cached[0]
+    else:
+        try:
+            payload = jwt.decode(token, SECRET_KEY_BYTES, algorithms=[ALGORITHM])
+            user_id: str = payload.get("sub")
+            if not user_id:
+                raise HTTPException(status_code=401, detail="Invalid token")
+        except jwt.PyJWTError:
             raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        with _tok_lock:
+            _tok_cache[key] = (user_id, payload["exp"])
 
-    user = session.query(models.User).get(user_id)
+    user = session.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
\ No newline at end of file
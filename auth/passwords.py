@@ -0,0 +1,32 @@
+# backend/auth/passwords.py
+# Idea share-password helpers. Leaf module (no backend imports) so any router can import them.
+import hashlib, hmac
+from typing import Optional, Tuple
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+_ph = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+def _is_legacy(hash_val: str) -> bool:
+    # Older ideas stored an unsalted sha256 hex digest
+    return not hash_val.startswith("$argon2")
+
+def hash_idea_password(pw: str) -> str:
+    return _ph.hash(pw)
+
+def _verify(pw: str, hash_val: str) -> bool:
+    if _is_legacy(hash_val):
+        return hmac.compare_digest(hashlib.sha256(pw.encode()).hexdigest(), hash_val)
+    try:
+        return _ph.verify(hash_val, pw)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def check_idea_password(pw: Optional[str], hash_val: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """-> (ok, new_hash). new_hash is set when the stored hash is legacy sha256 or uses
+    outdated argon2 parameters; callers should store it (like passlib's verify_and_update)"""
+    if not pw or not hash_val or not _verify(pw, hash_val):
+        return False, None
+    if _is_legacy(hash_val) or _ph.check_needs_rehash(hash_val):
+        return True, hash_idea_password(pw)
+    return True, None
@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session, defer
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from cachetools import TTLCache
+import hashlib, json, re
 
 from backend import db, models
 from backend.auth.main import get_current_user
-from backend.chat.openai_helper import ask_openai
+from backend.chat.openai_helper import SYSTEM_RULES, ChatUnavailable, ask_openai, ask_openai_stream
 
 router = APIRouter()
 
+# LLM answers keyed by _idea_fingerprint(idea content + question)
+_llm_cache = TTLCache(maxsize=2048, ttl=3600)
+
+# Answers that mean the model couldn't help → logged as unanswered
+_UNANSWERED_RE = re.compile(r"i\s*don['’]?t\s*know", re.IGNORECASE)
+CHAT_UNAVAILABLE = "[Chat unavailable]"
+
 # ==== Schemas ====
 class AskRequest(BaseModel):
     question: str
@@ -27,99 +38,219 @@ class UpdateQARequest(BaseModel):
     visibility: Optional[str] = None
 
 
-# ==== Routes ====
+# ==== Helpers ====
+# Prompt size caps: LLM latency and cost grow with every context token
+MAX_CONTEXT_CHARS = 12000
+MAX_QA_ITEMS = 20
+
+def _idea_fingerprint(*chunks: str) -> bytes:
+    """16-byte blake2b digest over the given strings (NUL-separated)"""
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        h.update(chunk.encode())
+        h.update(b"\0")
+    return h.digest()
+
+def _persist_qa_history(idea_id: str, question: str, answer: str) -> None:
+    """Background task: store an answered question in its own short-lived session"""
+    session = db.SessionLocal()
+    try:
+        session.execute(
+            insert(models.QAHistory),
+            [{"idea_id": idea_id, "question": question, "answer": answer}],
+        )
+        session.commit()
+    finally:
+        session.close()
+
+def _persist_unanswered(idea_id: str, question: str) -> None:
+    """Log a question the model couldn't answer, in its own short-lived session"""
+    session = db.SessionLocal()
+    try:
+        session.execute(
+            insert(models.UnansweredQuestion),
+            [{"idea_id": idea_id, "question": question}],
+        )
+        session.commit()
+    finally:
+        session.close()
+
+def _fit_budget(sections: List[Tuple[str, str]], budget: int, emit_order: Optional[Tuple[int, ...]] = None) -> str:
+    """Truncate (header, body) sections in priority order to fit the budget, then join them
+    in emit_order (indices into sections; defaults to priority order)"""
+    fitted = {}
+    for i, (header, body) in enumerate(sections):
+        budget -= len(header)
+        if budget <= 0:
+            break
+        if len(body) > budget:
+            body = body[:budget] + "…"
+        fitted[i] = header + body
+        budget -= len(body)
+    order = emit_order or range(len(sections))
+    return "".join([fitted[i] for i in order if i in fitted])
+
+def _build_context(session: Session, idea_id: str) -> Tuple[models.Idea, str, list, str]:
+    """Load an idea and build its prompt → (idea, context, public_assets, content_key)"""
+    # Read phase: nothing is pending, so skip autoflush checks before each query
+    with session.no_autoflush:
+        idea = session.get(models.Idea, idea_id, options=[defer(models.Idea.password_hash)])
+        if not idea:
+            raise HTTPException(status_code=404, detail="Idea not found")
+
+        # Build recent Q&A history (last 5 messages, oldest first)
+        recent = (
+            session.query(models.QAHistory.question, models.QAHistory.answer, models.QAHistory.created_at)
+            .filter(models.QAHistory.idea_id == idea.id)
+            .order_by(models.QAHistory.created_at.desc())
+            .limit(5)
+            .subquery()
+        )
+        history = session.query(recent.c.question, recent.c.answer).order_by(recent.c.created_at).all()
+
+        # Collect persistent Q&A repo items (most recent MAX_QA_ITEMS; only the columns used)
+        qa_repo = (
+            session.query(
+                models.RepoItem.question, models.RepoItem.answer,
+                models.RepoItem.name, models.RepoItem.content,
+            )
+            .filter(
+                models.RepoItem.idea_id == idea.id,
+                models.RepoItem.type == "qa",
+                models.RepoItem.visibility.in_(("public", "private")),
+            )
+            .order_by(models.RepoItem.created_at.desc(), models.RepoItem.id)
+            .limit(MAX_QA_ITEMS)
+            .all()
+        )
 
-@router.post("/ideas/{idea_id}/ask", response_model=AskResponse)
-def ask_idea(
-    idea_id: str,
-    req: AskRequest,
-    session: Session = Depends(db.get_session),
-    current_user: models.User = Depends(get_current_user)  # optional, could allow anon
-):
-    """Ask a question to an idea with short-term + persistent memory"""
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
+        # Collect assets (title/url rows only)
+        public_assets = (
+            session.query(models.Asset.title, models.Asset.url)
+            .filter(models.Asset.idea_id == idea.id, models.Asset.visibility == "public")
+            .order_by(models.Asset.id)
+            .all()
+        )
 
-    # Build recent Q&A history (last 5 messages)
-    history = (
-        session.query(models.QAHistory)
-        .filter(models.QAHistory.idea_id == idea.id)
-        .order_by(models.QAHistory.created_at.desc())
-        .limit(5)
-        .all()
-    )
-    history_text = "\n".join(
-        [f"Q: {h.question}\nA: {h.answer}" for h in reversed(history)]
-    )
+        # Build context capped at MAX_CONTEXT_CHARS. Budget priority: markdown, history, QA, assets.
+        # Emitted with the stable sections first (deterministic order) so the prompt prefix
+        # stays cacheable; recent history changes every turn, so it is written last.
+        qa_lines = []
+        for r in qa_repo:
+            if r.question is not None:
+                qa_lines.append(f"Q: {r.question}\nA: {r.answer or ''}\n")
+            else:
+                # Older rows only have the "Q: ..." / "A: ..." display strings
+                qa_lines.append(f"Q: {r.name.removeprefix('Q: ')}\nA: {(r.content or '').removeprefix('A: ')}\n")
+        qa_text = "".join(qa_lines)
+        history_text = "".join([f"Q: {question}\nA: {answer}\n" for question, answer in history])
+        assets_text = "".join([f"- {a.title}: {a.url}\n" for a in public_assets])
+        context = _fit_budget(
+            [
+                ("\n# PUBLIC MARKDOWN\n", idea.public_md or ""),
+                ("\n\n# PRIVATE MARKDOWN\n", idea.private_md or ""),
+                ("\n# RECENT Q&A HISTORY\n", history_text),
+                ("\n\n# PERSISTENT QA\n", qa_text),
+                ("\n# PUBLIC ASSETS\n", assets_text),
+            ],
+            MAX_CONTEXT_CHARS,
+            emit_order=(0, 1, 3, 4, 2),
+        )
 
-    # Collect persistent Q&A repo items
-    qa_items = [
-        f"Q: {r.name.replace('Q: ', '')}\nA: {r.content.replace('A: ', '')}"
-        for r in idea.repo
-        if r.type == "qa" and r.visibility in ["public", "private"]
-    ]
-    qa_items_text = "\n".join(qa_items)
-
-    # Collect assets
-    assets_text = "\n".join(
-        [f"- {a.title}: {a.url}" for a in idea.assets if a.visibility == "public"]
+    # Everything but recent history (which changes on every answered ask) → answer-cache key
+    content_key = _idea_fingerprint(
+        idea.id, idea.public_md or "", idea.private_md or "", qa_text, assets_text
+    ).hex()
+    return idea, context, public_assets, content_key
+
+def _public_references(session: Session, idea_id: str) -> list:
+    """Public repo items as (name, url) rows for the /ask response"""
+    return (
+        session.query(models.RepoItem.name, models.RepoItem.url)
+        .filter(models.RepoItem.idea_id == idea_id, models.RepoItem.visibility == "public")
+        .all()
     )
 
-    # Build context
-    context = f"""
-# PUBLIC MARKDOWN
-{idea.public_md or ""}
-
-# PRIVATE MARKDOWN
-{idea.private_md or ""}
+def _assert_owner(session: Session, idea_id: str, user_id: str) -> None:
+    """404 if the idea doesn't exist, 403 if it isn't owned by user_id"""
+    owner_id = session.scalar(select(models.Idea.user_id).where(models.Idea.id == idea_id))
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Idea not found")
+    if owner_id != user_id:
+        raise HTTPException(status_code=403, detail="Not your idea")
 
-# PERSISTENT QA
-{qa_items_text}
 
-# RECENT Q&A HISTORY
-{history_text}
+# ==== Routes ====
 
-# PUBLIC ASSETS
-{assets_text}
-"""
+@router.post("/ideas/{idea_id}/ask", response_model=AskResponse, response_model_exclude_none=True)
+async def ask_idea(
+    idea_id: str,
+    req: AskRequest,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(db.get_session),
+    current_user: models.User = Depends(get_current_user)  # optional, could allow anon
+):
+    """Ask a question to an idea with short-term + persistent memory"""
+    # Sync Session → run DB phases in the threadpool, never on the event loop
+    idea, context, public_assets, content_key = await run_in_threadpool(_build_context, session, idea_id)
+
+    # Call LLM (or reuse a cached answer for the same idea content + question)
+    cache_key = _idea_fingerprint(content_key, req.question)
+    raw_answer = _llm_cache.get(cache_key)
+    if raw_answer is None:
+        try:
+            raw_answer = await ask_openai(SYSTEM_RULES, context, req.question, cache_key=f"idea:{idea.id}")
+        except ChatUnavailable:
+            raw_answer = CHAT_UNAVAILABLE
+        else:
+            _llm_cache[cache_key] = raw_answer
+
+    # If model is unavailable or can't answer → log in unanswered
+    if raw_answer is CHAT_UNAVAILABLE or _UNANSWERED_RE.search(raw_answer):
+        background_tasks.add_task(_persist_unanswered, idea.id, req.question)
+        return ORJSONResponse(content={"answer": raw_answer, "images": [], "references": []})
+
+    # Otherwise → normal QAHistory (written after the response is sent)
+    background_tasks.add_task(_persist_qa_history, idea.id, req.question, raw_answer)
+
+    public_repo = await run_in_threadpool(_public_references, session, idea_id)
+
+    # Build response (returned directly; AskResponse only documents the shape)
+    return ORJSONResponse(content={
+        "answer": raw_answer,
+        "images": [{"title": a.title, "url": a.url} for a in public_assets],
+        "references": [{"title": r.name, "url": r.url} for r in public_repo],
+    })
+
+
+@router.post("/ideas/{idea_id}/ask/stream")
+async def ask_idea_stream(
+    idea_id: str,
+    req: AskRequest,
+    session: Session = Depends(db.get_session),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Same as /ask, but streams the answer as Server-Sent Events"""
+    _, context, _, _ = await run_in_threadpool(_build_context, session, idea_id)
 
-    # Call LLM
-    raw_answer = ask_openai(context, req.question)
+    async def events():
+        chunks = []
+        try:
+            async for delta in ask_openai_stream(SYSTEM_RULES, context, req.question, cache_key=f"idea:{idea_id}"):
+                chunks.append(delta)
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            answer = "".join(chunks).strip()
+        except ChatUnavailable:
+            answer = CHAT_UNAVAILABLE
+        yield f"event: done\ndata: {json.dumps({'answer': answer})}\n\n"
 
-    # If model can't answer → log in unanswered
-    if "i don't know" in raw_answer.lower() or "chat unavailable" in raw_answer.lower():
-        unanswered = models.UnansweredQuestion(
-            idea_id=idea.id,
-            question=req.question,
-            created_at=datetime.utcnow()
-        )
-        session.add(unanswered)
-        session.commit()
-        return AskResponse(answer=raw_answer, images=[], references=[])
-
-    # Otherwise → normal QAHistory
-    qa = models.QAHistory(
-        idea_id=idea.id,
-        question=req.question,
-        answer=raw_answer,
-        created_at=datetime.utcnow()
-    )
-    session.add(qa)
-    session.commit()
+        # Persist once the client has the full answer
+        if answer is CHAT_UNAVAILABLE or _UNANSWERED_RE.search(answer):
+            await run_in_threadpool(_persist_unanswered, idea_id, req.question)
+        else:
+            await run_in_threadpool(_persist_qa_history, idea_id, req.question, answer)
 
-    # Build response
-    return AskResponse(
-        answer=raw_answer,
-        images=[
-            {"title": a.title, "url": a.url}
-            for a in idea.assets if a.visibility == "public"
-        ],
-        references=[
-            {"title": r.name, "url": r.url}
-            for r in idea.repo if r.visibility == "public"
-        ]
-    )
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @router.get("/ideas/{idea_id}/unanswered")
@@ -129,13 +260,13 @@ def get_unanswered(
     current_user: models.User = Depends(get_current_user)
 ):
     """List unanswered questions for an idea (owner only)"""
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    if idea.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your idea")
+    _assert_owner(session, idea_id, current_user.id)
 
-    return idea.unanswered_questions
+    return (
+        session.query(models.UnansweredQuestion)
+        .filter(models.UnansweredQuestion.idea_id == idea_id)
+        .all()
+    )
 
 
 @router.post("/ideas/{idea_id}/unanswered/{uq_id}/answer")
@@ -147,37 +278,42 @@ def answer_unanswered(
     current_user: models.User = Depends(get_current_user)
 ):
     """Creator supplies an answer for a previously unanswered question"""
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    if idea.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your idea")
-
-    uq = session.query(models.UnansweredQuestion).get(uq_id)
-    if not uq or uq.idea_id != idea.id:
+    # Question + ownership in one round trip; only a miss needs the owner check
+    question = session.scalar(
+        select(models.UnansweredQuestion.question)
+        .join(models.Idea)
+        .where(
+            models.UnansweredQuestion.id == uq_id,
+            models.Idea.id == idea_id,
+            models.Idea.user_id == current_user.id,
+        )
+    )
+    if question is None:
+        _assert_owner(session, idea_id, current_user.id)
         raise HTTPException(status_code=404, detail="Unanswered question not found")
 
     # Add to QAHistory
-    qa = models.QAHistory(
-        idea_id=idea.id,
-        question=uq.question,
-        answer=req.answer,
-        created_at=datetime.utcnow()
+    session.execute(
+        insert(models.QAHistory),
+        [{"idea_id": idea_id, "question": question, "answer": req.answer}],
     )
-    session.add(qa)
 
     # Add to Repo (persistent knowledge base)
-    repo_item = models.RepoItem(
-        idea_id=idea.id,
-        name=f"Q: {uq.question}",
-        type="qa",
-        content=f"A: {req.answer}",
-        visibility="private"
+    session.execute(
+        insert(models.RepoItem),
+        [{
+            "idea_id": idea_id,
+            "name": f"Q: {question}",
+            "type": "qa",
+            "content": f"A: {req.answer}",
+            "question": question,
+            "answer": req.answer,
+            "visibility": "private",
+        }],
     )
-    session.add(repo_item)
 
     # Remove unanswered
-    session.delete(uq)
+    session.execute(delete(models.UnansweredQuestion).where(models.UnansweredQuestion.id == uq_id))
     session.commit()
 
     return {"detail": "Unanswered question resolved and added to knowledge base"}
@@ -192,13 +328,13 @@ def list_persistent_qa(
     current_user: models.User = Depends(get_current_user)
 ):
     """List persistent Q&A (repo items) for an idea (owner only)"""
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    if idea.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your idea")
+    _assert_owner(session, idea_id, current_user.id)
 
-    return [r for r in idea.repo if r.type == "qa"]
+    return (
+        session.query(models.RepoItem)
+        .filter(models.RepoItem.idea_id == idea_id, models.RepoItem.type == "qa")
+        .all()
+    )
 
 
 @router.patch("/ideas/{idea_id}/qa/{qa_id}")
@@ -210,18 +346,24 @@ def update_persistent_qa(
     current_user: models.User = Depends(get_current_user)
 ):
     """Update a persistent QA entry (owner only)"""
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    if idea.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your idea")
-
-    repo_item = session.query(models.RepoItem).get(qa_id)
-    if not repo_item or repo_item.idea_id != idea.id or repo_item.type != "qa":
+    repo_item = (
+        session.query(models.RepoItem)
+        .join(models.Idea)
+        .filter(
+            models.RepoItem.id == qa_id,
+            models.RepoItem.type == "qa",
+            models.Idea.id == idea_id,
+            models.Idea.user_id == current_user.id,
+        )
+        .first()
+    )
+    if not repo_item:
+        _assert_owner(session, idea_id, current_user.id)
         raise HTTPException(status_code=404, detail="QA repo item not found")
 
     if req.answer:
         repo_item.content = f"A: {req.answer}"
+        repo_item.answer = req.answer
     if req.visibility:
         repo_item.visibility = req.visibility
 
@@ -237,14 +379,19 @@ def delete_persistent_qa(
     current_user: models.User = Depends(get_current_user)
 ):
     """Delete a persistent QA entry (owner only)"""
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    if idea.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your idea")
-
-    repo_item = session.query(models.RepoItem).get(qa_id)
-    if not repo_item or repo_item.idea_id != idea.id or repo_item.type != "qa":
+    repo_item = (
+        session.query(models.RepoItem)
+        .join(models.Idea)
+        .filter(
+            models.RepoItem.id == qa_id,
+            models.RepoItem.type == "qa",
+            models.Idea.id == idea_id,
+            models.Idea.user_id == current_user.id,
+        )
+        .first()
+    )
+    if not repo_item:
+        _assert_owner(session, idea_id, current_user.id)
         raise HTTPException(status_code=404, detail="QA repo item not found")
 
     session.delete(repo_item)
@@ -1,36 +1,96 @@
 import os
-from openai import OpenAI
+import asyncio
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+# Upper bound on concurrent OpenAI calls from this process, streams included
+# (a stream holds its slot until it finishes). Sized to the connection pool by
+# default; lower it to stay under a tight account rate limit, at the cost of
+# queueing /ask and create_idea behind open streams.
+MAX_IN_FLIGHT = int(os.getenv("OPENAI_MAX_IN_FLIGHT", "200"))
+# The SDK retries 429s, timeouts and 5xx with exponential backoff + jitter
+MAX_RETRIES = 4
 
-def ask_openai(context: str, question: str) -> str:
-    """Ask OpenAI with context + question, return plain answer text"""
-    if not client:
-        return "[Chat unavailable]"
+# One process-wide client → one keep-alive connection pool shared by all requests
+client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    max_retries=MAX_RETRIES,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=MAX_IN_FLIGHT, max_keepalive_connections=100)
+    ),
+) if OPENAI_API_KEY else None
+_in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+
+
+class ChatUnavailable(Exception):
+    """Raised when no answer could be produced (no API key or the call failed)"""
+
+
+# Static rules go first as their own message so the provider can cache the
+# shared prefix; only the idea context and question vary per call.
+SYSTEM_RULES = (
+    "You are the interactive version of an idea (a living document).\n"
+    "Answer truthfully and concisely. If you don't know, say so."
+)
 
-    prompt = f"""
-You are the interactive version of an idea (a living document).
-Answer truthfully and concisely. If you don't know, say so.
 
-# CONTEXT
-{context}
+def _messages(system_rules: str, context: str, question: str) -> list:
+    return [
+        {"role": "system", "content": system_rules},
+        {"role": "user", "content": "# CONTEXT\n" + context},
+        {"role": "user", "content": "# QUESTION\n" + question},
+    ]
 
-# QUESTION
-{question}
-"""
+
+def _cache_hint(cache_key: str | None) -> dict | None:
+    """Route calls sharing a prefix (e.g. one idea) to the same prompt cache"""
+    return {"prompt_cache_key": cache_key} if cache_key else None
+
+
+async def _complete(system_rules: str, context: str, question: str, cache_key: str | None) -> str:
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful, concise assistant."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=400,
-        )
+        async with _in_flight:
+            resp = await client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=_messages(system_rules, context, question),
+                temperature=0.3,
+                max_tokens=400,
+                extra_body=_cache_hint(cache_key),
+            )
         return resp.choices[0].message.content.strip()
     except Exception as e:
-        return f"[Chat error: {e}]"
\ No newline at end of file
+        raise ChatUnavailable(str(e)) from e
+
+
+async def ask_openai(system_rules: str, context: str, question: str, cache_key: str | None = None) -> str:
+    """Ask OpenAI with rules + context + question, return plain answer text.
+    Raises ChatUnavailable on failure."""
+    if not client:
+        raise ChatUnavailable("no OpenAI API key configured")
+
+    return await _complete(system_rules, context, question, cache_key)
+
+
+async def ask_openai_stream(system_rules: str, context: str, question: str, cache_key: str | None = None):
+    """Like ask_openai, but yields answer text deltas as they arrive"""
+    if not client:
+        raise ChatUnavailable("no OpenAI API key configured")
+
+    try:
+        async with _in_flight:
+            stream = await client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=_messages(system_rules, context, question),
+                temperature=0.3,
+                max_tokens=400,
+                stream=True,
+                extra_body=_cache_hint(cache_key),
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        raise ChatUnavailable(str(e)) from e
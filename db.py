@@ -2,16 +2,23 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 
 # Use Postgres if DATABASE_URL is set, else fallback to SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ideas.db")
 
-# Only SQLite needs check_same_thread
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+if DATABASE_URL.startswith("sqlite"):
+    # Only SQLite needs check_same_thread; an in-memory DB must share one connection
+    engine_kwargs = {"connect_args": {"check_same_thread": False}}
+    if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+        engine_kwargs["poolclass"] = StaticPool
+else:
+    # Server DBs: room for concurrent requests, and no stale sockets after idle periods
+    engine_kwargs = {"pool_size": 20, "max_overflow": 40, "pool_pre_ping": True, "pool_recycle": 1800}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+engine = create_engine(DATABASE_URL, **engine_kwargs)
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
 
 # 🔑 Shared Base for all models
 Base = declarative_base()
@@ -10,10 +10,10 @@ router = APIRouter()
 @router.get("/", response_model=List[IdeaResponse])
 def get_feed(session: Session = Depends(db.get_session)):
     """List all public ideas (latest first)"""
-    ideas = (
+    # Rows go straight to response_model, which validates them once
+    return (
         session.query(models.Idea)
         .filter(models.Idea.visibility == "public")
         .order_by(models.Idea.created_at.desc())
         .all()
-    )
-    return [IdeaResponse.from_orm(i) for i in ideas]
\ No newline at end of file
+    )
\ No newline at end of file
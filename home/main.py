@@ -1,25 +1,29 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from pydantic import BaseModel
 from typing import List
 
 from backend import db, models
 from backend.auth.main import get_current_user
 from backend.ideas.main import IdeaResponse
+from backend.users.main import UserProfile
 
 router = APIRouter()
 
-@router.get("/", response_model=dict)
+# ==== Schemas ====
+class HomeResponse(BaseModel):
+    user: UserProfile
+    ideas: List[IdeaResponse]
+
+
+# ==== Routes ====
+
+@router.get("/", response_model=HomeResponse)
 def get_home(
     session: Session = Depends(db.get_session),
     current_user: models.User = Depends(get_current_user)
 ):
     """Return the current user's dashboard: profile + ideas"""
     ideas = session.query(models.Idea).filter(models.Idea.user_id == current_user.id).all()
-    return {
-        "user": {
-            "id": current_user.id,
-            "name": current_user.name,
-            "email": current_user.email,
-        },
-        "ideas": [IdeaResponse.from_orm(i) for i in ideas],
-    }
\ No newline at end of file
+    # ORM objects are validated once, by response_model
+    return {"user": current_user, "ideas": ideas}
\ No newline at end of file
@@ -1,6 +1,36 @@
-from backend.chat.openai_helper import ask_openai
+import asyncio
+import hashlib
+from cachetools import TTLCache
 
-def generate_markdown_from_submission(title: str, notes: str, links: list, summary: str):
+from backend.chat.openai_helper import OPENAI_MODEL, ChatUnavailable, ask_openai
+
+# Static instructions → system message; only the submission context varies per call
+PUBLIC_PAGE_RULES = (
+    "You turn raw idea submissions into living documents.\n"
+    "Turn the submission into a clear, inspiring public-facing markdown page."
+)
+PRIVATE_PAGE_RULES = (
+    "You turn raw idea submissions into living documents.\n"
+    "Turn the submission into exhaustive private notes for the creator."
+)
+
+# Generated pages keyed by sha256(model, rules, context): identical resubmissions skip the LLM
+_page_cache = TTLCache(maxsize=1024, ttl=3600)
+
+async def _generate_page(rules: str, context: str, instruction: str) -> str:
+    h = hashlib.sha256()
+    for part in (OPENAI_MODEL, rules, context, instruction):
+        h.update(part.encode())
+        h.update(b"\0")
+    key = h.digest()
+
+    page = _page_cache.get(key)
+    if page is None:
+        page = await ask_openai(rules, context, instruction)
+        _page_cache[key] = page
+    return page
+
+async def generate_markdown_from_submission(title: str, notes: str, links: list, summary: str):
     context = f"""
 # TITLE
 {title}
@@ -15,10 +45,13 @@ def generate_markdown_from_submission(title: str, notes: str, links: list, summa
 {", ".join(links or [])}
 """
 
-    public_prompt = f"Turn this into a clear, inspiring public-facing markdown page:\n{context}"
-    private_prompt = f"Turn this into exhaustive private notes for the creator:\n{context}"
-
-    public_md = ask_openai(public_prompt, "Generate public markdown page")
-    private_md = ask_openai(private_prompt, "Generate private markdown page")
+    # If the model is unavailable the idea is still created, just without generated pages
+    try:
+        public_md, private_md = await asyncio.gather(
+            _generate_page(PUBLIC_PAGE_RULES, context, "Generate public markdown page"),
+            _generate_page(PRIVATE_PAGE_RULES, context, "Generate private markdown page"),
+        )
+    except ChatUnavailable:
+        public_md = private_md = None
 
-    return public_md, private_md
\ No newline at end of file
+    return public_md, private_md, context
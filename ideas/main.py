@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
-import uuid, hashlib
+import uuid
 
 from backend import db, models
 from backend.auth.main import get_current_user
-from backend.chat.openai_helper import ask_openai
+from backend.auth.passwords import hash_idea_password, check_idea_password
+from backend.ideas.ai_helper import generate_markdown_from_submission
 
 router = APIRouter()
 
@@ -43,47 +44,40 @@ class IdeaResponse(BaseModel):
         orm_mode = True
 
 
-# ==== Helpers ====
-def hash_password(pw: str) -> str:
-    return hashlib.sha256(pw.encode()).hexdigest()
-
-def check_password(pw: str, hash_val: str) -> bool:
-    return hash_password(pw) == hash_val
-
-def generate_markdown_from_submission(title: str, notes: str, links: List[str], summary: str):
-    context = f"""
-# TITLE
-{title}
-
-# SUMMARY
-{summary or ""}
+# ==== Dependencies ====
 
-# NOTES
-{notes or ""}
-
-# LINKS
-{", ".join(links or [])}
-"""
+def require_idea(
+    idea_id: str,
+    session: Session = Depends(db.get_session),
+    current_user: models.User = Depends(get_current_user),  # authenticate before revealing existence
+) -> models.Idea:
+    """Load the idea named in the path, or 404"""
+    idea = session.get(models.Idea, idea_id)
+    if not idea:
+        raise HTTPException(status_code=404, detail="Idea not found")
+    return idea
 
-    public_prompt = f"Turn this into a clear, inspiring public-facing markdown page:\n{context}"
-    private_prompt = f"Turn this into exhaustive private notes for the creator:\n{context}"
 
-    public_md = ask_openai(public_prompt, "Generate public markdown page")
-    private_md = ask_openai(private_prompt, "Generate private markdown page")
+# ==== Helpers ====
 
-    return public_md, private_md, context
+def _save_new_idea(session: Session, idea: models.Idea, *related) -> models.Idea:
+    """Insert an idea and its related rows in one transaction (sync: run in the threadpool)"""
+    session.add_all([idea, *related])
+    session.commit()
+    session.refresh(idea)
+    return idea
 
 
 # ==== Routes ====
 
 @router.post("/", response_model=IdeaResponse)
-def create_idea(
+async def create_idea(
     req: IdeaSubmission,
     session: Session = Depends(db.get_session),
     current_user: models.User = Depends(get_current_user)
 ):
     """Create a new idea from raw submission (AI generates markdown)"""
-    public_md, private_md, raw_context = generate_markdown_from_submission(
+    public_md, private_md, raw_context = await generate_markdown_from_submission(
         req.title, req.notes, req.links, req.summary
     )
 
@@ -91,7 +85,8 @@ def create_idea(
     if req.visibility == "password":
         if not req.password:
             raise HTTPException(status_code=400, detail="Password required for password-protected ideas")
-        password_hash = hash_password(req.password)
+        # Argon2 is deliberately slow and memory-hard: keep it off the event loop
+        password_hash = await run_in_threadpool(hash_idea_password, req.password)
 
     idea = models.Idea(
         user_id=current_user.id,
@@ -102,57 +97,47 @@ def create_idea(
         password_hash=password_hash,
         clonable=req.clonable,
     )
-    session.add(idea)
-    session.commit()
-    session.refresh(idea)
 
-    # Save raw submission in repo
+    # Save raw submission in repo (same transaction as the idea)
     raw_repo_item = models.RepoItem(
-        idea_id=idea.id,
+        idea=idea,
         name="Raw Submission",
         type="raw_submission",
         content=raw_context,
         visibility="private",
-        created_at=datetime.utcnow()
     )
-    session.add(raw_repo_item)
-    session.commit()
-
-    return idea
+    return await run_in_threadpool(_save_new_idea, session, idea, raw_repo_item)
 
 
 @router.get("/{idea_id}", response_model=IdeaResponse)
 def get_idea(
-    idea_id: str,
+    idea: models.Idea = Depends(require_idea),
     password: Optional[str] = Query(None),
     session: Session = Depends(db.get_session),
     current_user: models.User = Depends(get_current_user)
 ):
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-
     # Respect privacy
     if idea.visibility == "private" and idea.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="This idea is private")
 
     if idea.visibility == "password" and idea.user_id != current_user.id:
-        if not password or not check_password(password, idea.password_hash):
+        ok, new_hash = check_idea_password(password, idea.password_hash)
+        if not ok:
             raise HTTPException(status_code=403, detail="Password required or incorrect")
+        if new_hash:
+            idea.password_hash = new_hash
+            session.commit()
 
     return idea
 
 
 @router.patch("/{idea_id}", response_model=IdeaResponse)
 def update_idea(
-    idea_id: str,
     req: UpdateIdeaRequest,
+    idea: models.Idea = Depends(require_idea),
     session: Session = Depends(db.get_session),
     current_user: models.User = Depends(get_current_user)
 ):
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
     if idea.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not your idea")
 
@@ -160,7 +145,7 @@ def update_idea(
     if req.public_md is not None: idea.public_md = req.public_md
     if req.private_md is not None: idea.private_md = req.private_md
     if req.visibility is not None: idea.visibility = req.visibility
-    if req.password is not None: idea.password_hash = hash_password(req.password)
+    if req.password is not None: idea.password_hash = hash_idea_password(req.password)
     if req.clonable is not None: idea.clonable = req.clonable
 
     session.commit()
@@ -170,13 +155,10 @@ def update_idea(
 
 @router.delete("/{idea_id}")
 def delete_idea(
-    idea_id: str,
+    idea: models.Idea = Depends(require_idea),
     session: Session = Depends(db.get_session),
     current_user: models.User = Depends(get_current_user)
 ):
-    idea = session.query(models.Idea).get(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
     if idea.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not your idea")
 
@@ -187,14 +169,10 @@ def delete_idea(
 
 @router.post("/{idea_id}/clone", response_model=IdeaResponse)
 def clone_idea(
-    idea_id: str,
+    parent: models.Idea = Depends(require_idea),
     session: Session = Depends(db.get_session),
     current_user: models.User = Depends(get_current_user)
 ):
-    parent = session.query(models.Idea).get(idea_id)
-    if not parent:
-        raise HTTPException(status_code=404, detail="Idea not found")
-
     # Respect privacy
     if parent.visibility == "private" and parent.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="This idea is private")
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
-from sqlalchemy import create_engine
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import create_engine, inspect, text
 
 from backend import models, db
 
@@ -21,8 +22,20 @@ from backend.share import main as share_router
 # Create DB tables (if not exist)
 models.Base.metadata.create_all(bind=db.engine)
 
+# create_all doesn't alter existing tables: add columns and indexes introduced since they were created
+_added_columns = {"repo_items": ["question", "answer"]}
+with db.engine.begin() as conn:
+    for table, columns in _added_columns.items():
+        existing = {c["name"] for c in inspect(conn).get_columns(table)}
+        for column in columns:
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} TEXT"))
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
 # FastAPI app
-app = FastAPI(title="Living Ideas API", version="0.2")
+app = FastAPI(title="Living Ideas API", version="0.2", default_response_class=ORJSONResponse)
 
 # Register routers
 app.include_router(auth_router.router, prefix="/auth", tags=["Auth"])
@@ -1,11 +1,18 @@
 # backend/models.py
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Index, func
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
+import secrets
 import uuid
 
 from backend.db import Base  # 🔑 import Base from db.py
 
+def _utcnow() -> datetime:
+    # Naive UTC with µs resolution, matching the existing `timestamp without time zone`
+    # columns (so same-second rows still order); the server_default only covers rows
+    # inserted outside the app
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -13,7 +20,7 @@ class User(Base):
     name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False, index=True)
     password_hash = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow, server_default=func.now())
 
 
 class Idea(Base):
@@ -26,13 +33,21 @@ class Idea(Base):
     private_md = Column(Text, nullable=True)
     visibility = Column(String, default="public")  # public / private / password
     parent_id = Column(String, ForeignKey("ideas.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow, server_default=func.now())
     clonable = Column(Boolean, default=True)
     password_hash = Column(String, nullable=True)
-    share_hash = Column(String, default=lambda: str(uuid.uuid4()), unique=True)
+    # 22-char URL-safe token; older rows keep their 36-char uuid4 strings, hence no length cap
+    share_hash = Column(String, default=lambda: secrets.token_urlsafe(16), unique=True, nullable=False)
 
     owner = relationship("User", backref="ideas")
 
+    __table_args__ = (
+        # serves the public feed: visibility filter + newest-first order
+        Index("ix_idea_vis_created", visibility, created_at.desc()),
+        # serves per-owner listings (list_my_ideas, home)
+        Index("ix_ideas_user_created", user_id, created_at),
+    )
+
 
 class Asset(Base):
     __tablename__ = "assets"
@@ -47,6 +62,10 @@ class Asset(Base):
 
     idea = relationship("Idea", backref="assets")
 
+    __table_args__ = (
+        Index("ix_asset_idea_vis", "idea_id", "visibility"),
+    )
+
 
 class RepoItem(Base):
     __tablename__ = "repo_items"
@@ -57,11 +76,17 @@ class RepoItem(Base):
     type = Column(String, nullable=False)  # "link", "file", "note", "qa"
     url = Column(String, nullable=True)
     content = Column(Text, nullable=True)
+    question = Column(Text, nullable=True)  # raw Q/A for type == "qa" (name/content keep the display form)
+    answer = Column(Text, nullable=True)
     visibility = Column(String, default="public")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow, server_default=func.now())
 
     idea = relationship("Idea", backref="repo")
 
+    __table_args__ = (
+        Index("ix_repo_idea_type_vis", "idea_id", "type", "visibility"),
+    )
+
 class QAHistory(Base):
     __tablename__ = "qa_history"
 
@@ -69,10 +94,15 @@ class QAHistory(Base):
     idea_id = Column(String, ForeignKey("ideas.id"), nullable=False)
     question = Column(Text, nullable=False)
     answer = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow, server_default=func.now())
 
     idea = relationship("Idea", backref="qa_history")
 
+    __table_args__ = (
+        # serves ask_idea's "latest N for this idea" query without a sort
+        Index("ix_qahistory_idea_created", idea_id, created_at.desc()),
+    )
+
 
 class UnansweredQuestion(Base):
     __tablename__ = "unanswered_questions"
@@ -80,7 +110,7 @@ class UnansweredQuestion(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     idea_id = Column(String, ForeignKey("ideas.id"), nullable=False)
     question = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow, server_default=func.now())
 
     idea = relationship("Idea", backref="unanswered_questions")
 
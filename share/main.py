@@ -4,7 +4,7 @@ from typing import Optional
 
 from backend import db, models
 from backend.ideas.main import IdeaResponse
-from backend.ideas.main import check_password  # reuse helper
+from backend.auth.passwords import check_idea_password
 
 router = APIRouter()
 
@@ -24,7 +24,11 @@ def get_shared_idea(
         raise HTTPException(status_code=403, detail="This idea is private and cannot be shared")
 
     if idea.visibility == "password":
-        if not password or not check_password(password, idea.password_hash):
+        ok, new_hash = check_idea_password(password, idea.password_hash)
+        if not ok:
             raise HTTPException(status_code=403, detail="Password required or incorrect")
+        if new_hash:
+            idea.password_hash = new_hash
+            session.commit()
 
     return idea
\ No newline at end of file
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from backend import db, models
 from backend.auth.main import get_current_user
@@ -17,6 +18,16 @@ class UserProfile(BaseModel):
     class Config:
         orm_mode = True
 
+class IdeaSummary(BaseModel):
+    id: str
+    title: str
+    visibility: str
+    created_at: Optional[datetime] = None
+    share_hash: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
 class UpdateUserRequest(BaseModel):
     name: str | None = None
     email: EmailStr | None = None
@@ -63,11 +74,20 @@ def delete_me(
     return {"detail": "User deleted"}
 
 
-@router.get("/me/ideas")
+@router.get("/me/ideas", response_model=List[IdeaSummary])
 def list_my_ideas(
     session: Session = Depends(db.get_session),
     current_user: models.User = Depends(get_current_user)
 ):
-    """List all ideas owned by the current user"""
-    ideas = session.query(models.Idea).filter(models.Idea.user_id == current_user.id).all()
-    return ideas
\ No newline at end of file
+    """List all ideas owned by the current user (summary columns only)"""
+    return (
+        session.query(
+            models.Idea.id,
+            models.Idea.title,
+            models.Idea.visibility,
+            models.Idea.created_at,
+            models.Idea.share_hash,
+        )
+        .filter(models.Idea.user_id == current_user.id)
+        .all()
+    )
\ No newline at end of file